@@ -36,7 +36,13 @@ function getClientIP(request: NextRequest): string {
   return '127.0.0.1'
 }
 
-function validateInput(message: string, llm_provider: string, model_name: string): { valid: boolean; error?: string; sanitizedMessage?: string } {
+// Caller address as seen by the hosting platform, never taken from client-supplied headers.
+// Undefined when the platform doesn't provide one (e.g. plain `next start`).
+function getVerifiedClientIP(request: NextRequest): string | undefined {
+  return request.ip || undefined
+}
+
+function validateInput(message: string, llm_provider: string, model_name: string, session_id?: string): { valid: boolean; error?: string; sanitizedMessage?: string } {
   // Message validation
   if (!message || typeof message !== 'string' || message.trim().length === 0) {
     return { valid: false, error: 'Message is required and must be a non-empty string' }
@@ -57,6 +63,11 @@ function validateInput(message: string, llm_provider: string, model_name: string
     return { valid: false, error: 'Model name must be a string' }
   }
   
+  // Session validation
+  if (session_id && (typeof session_id !== 'string' || !/^[a-f0-9]{32}$/.test(session_id))) {
+    return { valid: false, error: 'Invalid session id' }
+  }
+  
   // Sanitize message (basic XSS protection)
   const sanitizedMessage = message
     .replace(/<script\b[^<]*(?:(?!<\/script>)<[^<]*)*<\/script>/gi, '')
@@ -80,9 +91,9 @@ export async function POST(request: NextRequest) {
 
     // Parse and validate request
     const body = await request.json()
-    const { message, llm_provider = 'openai', model_name } = body
+    const { message, llm_provider = 'openai', model_name, session_id } = body
 
-    const validation = validateInput(message, llm_provider, model_name)
+    const validation = validateInput(message, llm_provider, model_name, session_id)
     if (!validation.valid) {
       return NextResponse.json(
         { error: validation.error },
@@ -99,14 +110,24 @@ export async function POST(request: NextRequest) {
     const controller = new AbortController()
     const timeoutId = setTimeout(() => controller.abort(), 30000) // 30 second timeout
     
-    const response = await fetch(`${backendUrl}/ask`, {
+    // Forward caller identity so the backend can apply per-user limits and priority
+    const authorization = request.headers.get('authorization')
+    const verifiedIP = getVerifiedClientIP(request)
+    const proxySecret = process.env.BACKEND_PROXY_SECRET
+    
+    const response = await fetch(`${backendUrl}/chat`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
         'User-Agent': 'CRM.AI-Frontend/1.0',
+        'X-Request-Timeout': '25',
+        ...(verifiedIP ? { 'X-Forwarded-For': verifiedIP } : {}),
+        ...(proxySecret ? { 'X-Proxy-Secret': proxySecret } : {}),
+        ...(authorization ? { 'Authorization': authorization } : {}),
       },
       body: JSON.stringify({
         question: sanitizedMessage,
+        session_id: session_id,
         llm_provider: llm_provider,
         model_name: model_name,
         use_reranker: true,
@@ -118,6 +139,13 @@ export async function POST(request: NextRequest) {
     clearTimeout(timeoutId)
 
     if (!response.ok) {
+      if (response.status === 429) {
+        return NextResponse.json(
+          { error: 'Rate limit exceeded. Please try again later.' },
+          { status: 429 }
+        )
+      }
+      
       if (response.status === 503) {
         return NextResponse.json(
           { error: 'AI service is temporarily unavailable. Please try again later.' },
@@ -139,6 +167,7 @@ export async function POST(request: NextRequest) {
     return NextResponse.json({
       success: true,
       answer: data.answer,
+      session_id: data.session_id,
       llm_used: data.llm_used || 'Unknown',
       chunks_used: data.chunks_used || 0,
       reranker_used: data.reranker_used || false,
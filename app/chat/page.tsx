@@ -29,6 +29,7 @@ export default function ChatPage() {
   const [selectedProvider, setSelectedProvider] = useState('openai')
   const [selectedModel, setSelectedModel] = useState('gpt-4o-mini')
   const [hasMessages, setHasMessages] = useState(false)
+  const [sessionId, setSessionId] = useState<string | null>(null)
   const [documents, setDocuments] = useState<Document[]>([])
   const [totalPdfs, setTotalPdfs] = useState(0)
   const [isUploading, setIsUploading] = useState(false)
@@ -189,6 +190,7 @@ export default function ChatPage() {
         },
         body: JSON.stringify({
           message: inputValue,
+          session_id: sessionId || undefined,
           llm_provider: selectedProvider,
           model_name: selectedModel
         }),
@@ -197,6 +199,9 @@ export default function ChatPage() {
       const data = await response.json()
 
       if (data.success) {
+        if (data.session_id) {
+          setSessionId(data.session_id)
+        }
         const botMessage: Message = {
           id: (Date.now() + 1).toString(),
           type: 'bot',
@@ -1,11 +1,25 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Header
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import Optional, Literal, List
 import os
+import asyncio
+import heapq
+import itertools
+import secrets
+import threading
+import time
+import uuid
+import numpy as np
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import PyPDF2
 import shutil
 from dotenv import load_dotenv
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,7 +27,6 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_groq import ChatGroq
@@ -48,6 +61,54 @@ if missing_keys:
     logger.warning(f"Missing API keys: {missing_keys}. Some LLM providers may not work.")
     logger.warning("Please create a .env file with your API keys. See env.example for reference.")
 
+# Document collections: PDFs directly in PDF_FOLDER form the default collection,
+# each subfolder is a named collection with its own index shard under INDEX_FOLDER
+PDF_FOLDER = "pdfs"
+INDEX_FOLDER = "indexes"
+DEFAULT_COLLECTION = "default"
+MAX_LOADED_COLLECTIONS = int(os.getenv("MAX_LOADED_COLLECTIONS", "4"))
+COLLECTION_IDLE_SECONDS = int(os.getenv("COLLECTION_IDLE_SECONDS", "1800"))
+
+# Retrieval and batch settings
+RETRIEVAL_K = 20  # Default candidates kept per question before reranking
+RETRIEVAL_MIN_K = int(os.getenv("RETRIEVAL_MIN_K", "5"))  # Depth when one chunk clearly wins
+RETRIEVAL_MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "40"))  # Depth when dense scores are flat
+CLEAR_WINNER_MARGIN = float(os.getenv("CLEAR_WINNER_MARGIN", "0.1"))  # Top-1 vs top-2 similarity gap
+FLAT_SCORE_SPREAD = float(os.getenv("FLAT_SCORE_SPREAD", "0.05"))  # Top-1 vs top-k gap counted as flat
+DENSE_DROP_MARGIN = float(os.getenv("DENSE_DROP_MARGIN", "0.25"))  # Skip cross-encoding this far below the top
+MIN_DENSE_SIMILARITY = float(os.getenv("MIN_DENSE_SIMILARITY", "0.2"))
+MIN_RERANK_SCORE = float(os.getenv("MIN_RERANK_SCORE", "-5.0"))  # Cross-encoder logit
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "5"))
+
+# Admission control settings for the question endpoints
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", "8"))  # Requests running at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))  # Requests waiting for a slot
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "15"))
+ADMISSION_PER_USER_CONCURRENCY = int(os.getenv("ADMISSION_PER_USER_CONCURRENCY", "2"))
+ADMISSION_RATE_PER_MINUTE = {
+    "admin": int(os.getenv("ADMISSION_ADMIN_RATE_PER_MINUTE", "120")),
+    "user": int(os.getenv("ADMISSION_USER_RATE_PER_MINUTE", "30")),
+    "anonymous": int(os.getenv("ADMISSION_ANON_RATE_PER_MINUTE", "10"))
+}
+ADMISSION_PRIORITY = {"admin": 0, "user": 1, "anonymous": 2}  # Lower is served first
+# Remote proxies can authenticate with this shared secret (X-Proxy-Secret) instead of by address
+ADMISSION_PROXY_SECRET = os.getenv("ADMISSION_PROXY_SECRET", "")
+ADMISSION_MAX_TRACKED_IDENTITIES = int(os.getenv("ADMISSION_MAX_TRACKED_IDENTITIES", "10000"))
+# Only these peers may set X-Forwarded-For (the Next.js proxy runs next to the backend by default)
+ADMISSION_TRUSTED_PROXIES = {
+    address.strip()
+    for address in os.getenv("ADMISSION_TRUSTED_PROXIES", "127.0.0.1,::1").split(",")
+    if address.strip()
+}
+
+# Conversation session settings
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))  # Recent turns kept verbatim
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "300"))  # Running summary of older turns
+SUMMARY_MAX_FAILURES = int(os.getenv("SUMMARY_MAX_FAILURES", "3"))  # Then oldest turns are dropped unsummarized
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize RAG system on startup"""
@@ -57,22 +118,25 @@ async def lifespan(app: FastAPI):
     logger.info(f"System started with {len(USERS)} users")
     
     try:
-        pdf_folder = "pdfs"  
+        pdf_folder = PDF_FOLDER
         
         if not os.path.exists(pdf_folder):
             os.makedirs(pdf_folder)
             logger.info(f"Created {pdf_folder} folder. Please add your PDF files there.")
-            yield
-            return
-            
-        num_pdfs, num_chunks = initialize_rag_system(pdf_folder)
-        logger.info(f"RAG system initialized with {num_pdfs} PDFs and {num_chunks} chunks")
+        else:
+            num_pdfs, num_chunks = initialize_rag_system(pdf_folder)
+            logger.info(f"RAG system initialized with {num_pdfs} PDFs and {num_chunks} chunks")
         
     except Exception as e:
         logger.error(f"Error initializing RAG system: {e}")
     
+    # Unload collection shards nobody queries
+    idle_eviction_task = asyncio.create_task(evict_idle_collections())
+    
     yield  # This is where the app runs
     
+    idle_eviction_task.cancel()
+    
     # Save users before shutdown
     save_users_to_file()
     logger.info("Shutting down RAG system")
@@ -86,6 +150,7 @@ app = FastAPI(
 # Pydantic models
 class QuestionRequest(BaseModel):
     question: str
+    collections: Optional[List[str]] = None  # None searches every collection
     llm_provider: Literal["openai", "groq", "gemini"] = "openai"
     model_name: Optional[str] = None
     use_reranker: bool = True
@@ -95,8 +160,59 @@ class QuestionResponse(BaseModel):
     answer: str
     status: str
     llm_used: str
+    chunks_retrieved: int
+    chunks_reranked: int
+    chunks_used: int
+    reranker_used: bool
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    collections: Optional[List[str]] = None  # None searches every collection
+    llm_provider: Literal["openai", "groq", "gemini"] = "openai"
+    model_name: Optional[str] = None
+    use_reranker: bool = True
+    max_chunks: int = 10
+    max_concurrency: Optional[int] = None
+    stream: bool = False
+
+class BatchAnswer(BaseModel):
+    index: int
+    question: str
+    answer: str
+    status: str
+    chunks_retrieved: int
+    chunks_reranked: int
+    chunks_used: int
+    error: Optional[str] = None
+
+class BatchQuestionResponse(BaseModel):
+    results: List[BatchAnswer]
+    status: str
+    llm_used: str
+    reranker_used: bool
+    total_questions: int
+    failed: int
+
+class ChatRequest(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+    collections: Optional[List[str]] = None  # None searches every collection
+    llm_provider: Literal["openai", "groq", "gemini"] = "openai"
+    model_name: Optional[str] = None
+    use_reranker: bool = True
+    max_chunks: int = 10
+
+class ChatResponse(BaseModel):
+    answer: str
+    status: str
+    session_id: str
+    standalone_question: str
+    llm_used: str
+    chunks_retrieved: int
+    chunks_reranked: int
     chunks_used: int
     reranker_used: bool
+    history_turns: int
 
 class LLMConfigRequest(BaseModel):
     llm_provider: Literal["openai", "groq", "gemini"]
@@ -125,9 +241,9 @@ class RegistrationResponse(BaseModel):
     status: str
 
 # Global variables to store the RAG components
-vector_store = None
-retriever = None
+collection_registry = None
 reranker = None
+embeddings = None
 current_llm_config = {"provider": "openai", "model": "gpt-4o-mini"}
 
 # Simple user store (replace with proper database in production)
@@ -176,6 +292,208 @@ def verify_any_token(authorization: str = Header(None)):
     else:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def get_request_identity(request: Request, authorization: str = Header(None)):
+    """Identify the caller of an open endpoint: token identity if logged in, client IP otherwise"""
+    if authorization:
+        try:
+            user = verify_any_token(authorization)
+            return {"key": f"token:{user['token']}", "role": user["role"]}
+        except HTTPException:
+            pass  # Stale or invalid tokens still get open access, just not as that user
+    
+    client_ip = request.client.host if request.client else "unknown"
+    
+    # Only a trusted proxy may tell us who the caller is: either it connects from a known
+    # address or it proves itself with the shared secret
+    proxy_secret = request.headers.get("x-proxy-secret")
+    trusted = client_ip in ADMISSION_TRUSTED_PROXIES or (
+        ADMISSION_PROXY_SECRET and proxy_secret and secrets.compare_digest(proxy_secret, ADMISSION_PROXY_SECRET)
+    )
+    
+    # The caller is the last hop the proxies didn't add themselves
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and trusted:
+        for address in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            client_ip = address
+            if address not in ADMISSION_TRUSTED_PROXIES:
+                break
+    
+    return {"key": f"ip:{client_ip}", "role": "anonymous"}
+
+class AdmissionTicket:
+    """Granted slots; release() is safe to call more than once"""
+    
+    def __init__(self, controller, identity_key: str, slots: int):
+        self._controller = controller
+        self._identity_key = identity_key
+        self.slots = slots
+        self._released = False
+    
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self._identity_key, self.slots)
+
+class AdmissionController:
+    """Bounded priority queue in front of the reranker and LLM calls
+    
+    Callers are rejected with 429 when they exceed their rate or concurrency limits and
+    with 503 when their deadline passes before a slot frees up. Waiting callers are served
+    by priority (admin, then user, then anonymous), FIFO within one. When the queue is full,
+    the lowest-priority waiter is shed to make room for a caller that outranks it.
+    
+    A request may take several slots (a batch counts each concurrent LLM call) and cost
+    several rate tokens (a batch costs one per question).
+    """
+    
+    def __init__(self, max_active: int, max_queue: int, per_user_concurrency: int):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.per_user_concurrency = per_user_concurrency
+        self._active = 0  # Slots in use
+        self._waiters = []  # Heap of (priority, sequence, slots, future)
+        self._sequence = itertools.count()
+        self._user_inflight = defaultdict(int)  # Queued plus running requests per identity
+        self._buckets = OrderedDict()  # identity key -> (tokens, last refill time), least recently used first
+        self._wait_times = deque(maxlen=1000)
+        self._counters = defaultdict(int)
+    
+    def _take_rate_tokens(self, identity_key: str, rate_per_minute: int, cost: int) -> bool:
+        now = time.monotonic()
+        self._prune_buckets(now)
+        
+        tokens, last = self._buckets.get(identity_key, (float(rate_per_minute), now))
+        tokens = min(float(rate_per_minute), tokens + (now - last) * rate_per_minute / 60.0)
+        allowed = tokens >= cost
+        self._buckets[identity_key] = (tokens - cost if allowed else tokens, now)
+        self._buckets.move_to_end(identity_key)
+        return allowed
+    
+    def _prune_buckets(self, now: float):
+        # Buckets untouched for a minute have refilled, so dropping them changes nothing
+        while self._buckets:
+            _, last = next(iter(self._buckets.values()))
+            if now - last < 60 and len(self._buckets) < ADMISSION_MAX_TRACKED_IDENTITIES:
+                break
+            self._buckets.popitem(last=False)
+    
+    def _rejection(self, reason: str, status_code: int, detail: str, retry_after: int) -> HTTPException:
+        self._counters[f"rejected_{reason}"] += 1
+        return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+    
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: int):
+        raise self._rejection(reason, status_code, detail, retry_after)
+    
+    def _pending(self) -> List:
+        return [entry for entry in self._waiters if not entry[3].done()]
+    
+    async def admit(self, identity: dict, timeout: Optional[float] = None, cost: int = 1, slots: int = 1) -> AdmissionTicket:
+        """Wait for slots or raise HTTPException; the caller must release the returned ticket"""
+        key, role = identity["key"], identity["role"]
+        timeout = ADMISSION_MAX_WAIT_SECONDS if timeout is None else min(timeout, ADMISSION_MAX_WAIT_SECONDS)
+        slots = max(1, min(slots, self.max_active))
+        rate_per_minute = ADMISSION_RATE_PER_MINUTE[role]
+        
+        if timeout <= 0:
+            self._reject("expired", 503, "Request deadline already expired", 1)
+        
+        if cost > rate_per_minute:
+            self._reject("rate", 429, f"Request too large. At most {rate_per_minute} questions per minute are allowed.", 60)
+        
+        if self._user_inflight.get(key, 0) >= self.per_user_concurrency:
+            self._reject("concurrency", 429, "Too many concurrent requests. Please wait for earlier questions to finish.", 1)
+        
+        if not self._take_rate_tokens(key, rate_per_minute, cost):
+            self._reject("rate", 429, "Rate limit exceeded. Please try again later.", cost * 60 // max(rate_per_minute, 1) + 1)
+        
+        # Count the request against its identity before it waits, so queued requests hit the cap too
+        self._user_inflight[key] += 1
+        try:
+            await self._acquire_slots(ADMISSION_PRIORITY[role], slots, timeout)
+        except BaseException:
+            self._drop_inflight(key)
+            raise
+        
+        return AdmissionTicket(self, key, slots)
+    
+    async def _acquire_slots(self, priority: int, slots: int, timeout: float):
+        started = time.monotonic()
+        if self._active + slots <= self.max_active and not self._pending():
+            self._active += slots
+        else:
+            pending = self._pending()
+            if len(pending) >= self.max_queue:
+                lowest = max(pending, key=lambda entry: (entry[0], entry[1]))
+                if lowest[0] <= priority:
+                    self._reject("queue_full", 503, "Server is busy. Please try again shortly.", 5)
+                # Make room by shedding the newest waiter of the lowest priority
+                lowest[3].set_exception(self._rejection("shed", 503, "Server is busy. Please try again shortly.", 5))
+            
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), slots, future))
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    self._release_slots(slots)  # Granted right as the deadline hit
+                self._reject("expired", 503, "Server is busy and the request timed out in the queue.", 5)
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    self._release_slots(slots)
+                raise
+            finally:
+                # A waiter leaving early may unblock smaller ones queued behind it
+                self._grant_waiters()
+        
+        self._wait_times.append(time.monotonic() - started)
+        self._counters["admitted"] += 1
+    
+    def _drop_inflight(self, identity_key: str):
+        self._user_inflight[identity_key] -= 1
+        if self._user_inflight[identity_key] <= 0:
+            del self._user_inflight[identity_key]
+    
+    def _release(self, identity_key: str, slots: int):
+        self._drop_inflight(identity_key)
+        self._release_slots(slots)
+    
+    def _release_slots(self, slots: int):
+        self._active -= slots
+        self._grant_waiters()
+    
+    def _grant_waiters(self):
+        # Serve waiters strictly by priority: stop at the first one that doesn't fit yet
+        while self._waiters:
+            _, _, slots, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._active + slots > self.max_active:
+                return
+            heapq.heappop(self._waiters)
+            self._active += slots
+            future.set_result(True)
+    
+    def stats(self) -> dict:
+        waits = sorted(self._wait_times)
+        return {
+            "active": self._active,
+            "queue_depth": len(self._pending()),
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_wait_seconds": round(waits[int(len(waits) * 0.95) - 1], 3) if waits else 0.0,
+            "max_wait_seconds": round(waits[-1], 3) if waits else 0.0,
+            "tracked_identities": len(self._buckets),
+            "counters": dict(self._counters)
+        }
+
+admission = AdmissionController(ADMISSION_MAX_ACTIVE, ADMISSION_MAX_QUEUE, ADMISSION_PER_USER_CONCURRENCY)
+
+def get_request_timeout(x_request_timeout: Optional[float] = Header(None)):
+    """Seconds the client is willing to wait, from the optional X-Request-Timeout header"""
+    return x_request_timeout
+
 def get_llm(provider: str, model_name: Optional[str] = None):
     """Get the appropriate LLM based on provider and model"""
     
@@ -215,9 +533,283 @@ def extract_text_from_pdf(pdf_path):
         logger.error(f"Error extracting text from {pdf_path}: {e}")
         return ""
 
+def load_pdf_documents(pdf_files: List[str], collection: str):
+    """Extract and chunk PDFs into documents tagged with their source and collection"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800, 
+        chunk_overlap=100,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    
+    documents = []
+    for pdf_path in pdf_files:
+        logger.info(f"Processing {pdf_path}")
+        pdf_text = extract_text_from_pdf(pdf_path)
+        if pdf_text:
+            # Create chunks with metadata
+            chunks = splitter.create_documents(
+                [pdf_text], 
+                metadatas=[{"source": os.path.basename(pdf_path), "collection": collection}]
+            )
+            documents.extend(chunks)
+    
+    return documents
+
+def is_valid_collection_name(name: str) -> bool:
+    """Collection names double as folder names"""
+    return 0 < len(name) <= 40 and name.replace("_", "").replace("-", "").isalnum()
+
+def normalize_collection_name(name: str) -> str:
+    """Collection names are case-insensitive; pdfs/CVs and an uploaded 'cvs' are the same collection"""
+    return name.strip().lower()
+
+class CollectionRegistry:
+    """Named document collections, each with its own FAISS shard persisted on disk
+    
+    Shards are loaded lazily on first use and evicted from memory once more than
+    MAX_LOADED_COLLECTIONS are loaded or one sits idle for COLLECTION_IDLE_SECONDS.
+    MAX_LOADED_COLLECTIONS is a soft limit: while searches span more collections than
+    that, it stretches to the widest one so searching everything doesn't reload shards
+    on every query, and it falls back once no such search has run for
+    COLLECTION_IDLE_SECONDS. Shards pinned by a running search are never evicted.
+    A shard is rebuilt only when the PDFs in its folder change.
+    """
+    
+    def __init__(self, pdf_root: str, index_root: str, max_loaded: int, idle_seconds: int):
+        self.pdf_root = pdf_root
+        self.index_root = index_root
+        self.max_loaded = max_loaded
+        self.idle_seconds = idle_seconds
+        self._capacity = max_loaded
+        self._wide_search_at = 0.0  # Last search spanning more than max_loaded shards
+        self._loaded = OrderedDict()  # name -> [vector_store, last_used], least recently used first
+        self._pinned = defaultdict(int)  # name -> searches currently using the shard
+        self._folders = None  # name -> folder, cached until refresh()
+        self._lock = threading.Lock()
+        self._build_locks = defaultdict(threading.Lock)
+    
+    def _scan_folders(self) -> dict:
+        folders = {}
+        if self._list_pdfs(self.pdf_root):
+            folders[DEFAULT_COLLECTION] = self.pdf_root
+        if os.path.isdir(self.pdf_root):
+            for entry in sorted(os.listdir(self.pdf_root)):
+                path = os.path.join(self.pdf_root, entry)
+                name = normalize_collection_name(entry)
+                if (name == DEFAULT_COLLECTION or not is_valid_collection_name(name)
+                        or not os.path.isdir(path) or not self._list_pdfs(path)):
+                    continue
+                if name in folders:
+                    logger.warning(f"Ignoring folder {path}: collection '{name}' already uses {folders[name]}")
+                    continue
+                folders[name] = path
+        return folders
+    
+    def _folder_map(self) -> dict:
+        folders = self._folders
+        if folders is None:
+            folders = self._folders = self._scan_folders()
+        return folders
+    
+    def refresh(self):
+        """Forget the cached collection list after PDFs are added or removed"""
+        with self._lock:
+            self._folders = None
+            self._capacity = self.max_loaded
+    
+    def folder(self, name: str) -> str:
+        folders = self._folder_map()
+        if name in folders:
+            return folders[name]
+        return self.pdf_root if name == DEFAULT_COLLECTION else os.path.join(self.pdf_root, name)
+    
+    @staticmethod
+    def _list_pdfs(folder: str) -> List[str]:
+        if not os.path.isdir(folder):
+            return []
+        return sorted(
+            os.path.join(folder, filename)
+            for filename in os.listdir(folder)
+            if filename.lower().endswith('.pdf')
+        )
+    
+    def pdf_files(self, name: str) -> List[str]:
+        return self._list_pdfs(self.folder(name))
+    
+    def names(self) -> List[str]:
+        """Collections that have at least one PDF"""
+        return list(self._folder_map())
+    
+    def _index_path(self, name: str) -> str:
+        return os.path.join(self.index_root, name)
+    
+    def _file_manifest(self, name: str) -> List:
+        manifest = []
+        for pdf_path in self.pdf_files(name):
+            stat = os.stat(pdf_path)
+            manifest.append([os.path.basename(pdf_path), stat.st_size, int(stat.st_mtime)])
+        return manifest
+    
+    def _read_manifest(self, name: str) -> Optional[dict]:
+        manifest_path = os.path.join(self._index_path(name), "manifest.json")
+        try:
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _is_fresh(self, name: str) -> bool:
+        manifest = self._read_manifest(name)
+        return manifest is not None and manifest.get("files") == self._file_manifest(name)
+    
+    def _load_or_build(self, name: str):
+        """Reuse, load or rebuild one collection's shard; returns (store, num_pdfs, num_chunks)
+        
+        Runs under the collection's build lock and re-checks freshness there, so concurrent
+        callers that found the shard stale rebuild it only once.
+        """
+        with self._build_locks[name]:
+            pdf_files = self.pdf_files(name)
+            if not pdf_files:
+                raise Exception(f"No PDF files found in collection '{name}'")
+            
+            if self._is_fresh(name):
+                num_chunks = self._read_manifest(name).get("chunks", 0)
+                with self._lock:
+                    entry = self._loaded.get(name)
+                if entry:
+                    return entry[0], len(pdf_files), num_chunks
+                try:
+                    store = FAISS.load_local(
+                        self._index_path(name),
+                        embeddings,
+                        allow_dangerous_deserialization=True  # Files are written by this class only
+                    )
+                    logger.info(f"Loaded collection '{name}' from disk")
+                    self._put(name, store)
+                    return store, len(pdf_files), num_chunks
+                except Exception as e:
+                    logger.error(f"Error loading index for collection '{name}', rebuilding: {e}")
+            
+            files = self._file_manifest(name)
+            documents = load_pdf_documents(pdf_files, name)
+            if not documents:
+                raise Exception(f"No text could be extracted from PDF files in collection '{name}'")
+            
+            logger.info(f"Building index for collection '{name}'...")
+            store = FAISS.from_documents(documents, embeddings)
+            
+            index_path = self._index_path(name)
+            store.save_local(index_path)
+            with open(os.path.join(index_path, "manifest.json"), 'w') as f:
+                json.dump({"files": files, "chunks": len(documents)}, f, indent=2)
+            
+            self._put(name, store)
+            logger.info(f"Collection '{name}' indexed with {len(pdf_files)} PDFs and {len(documents)} chunks")
+            return store, len(pdf_files), len(documents)
+    
+    def build(self, name: str):
+        """Bring one collection's shard up to date after its PDFs changed; returns (num_pdfs, num_chunks)"""
+        self.refresh()
+        _, num_pdfs, num_chunks = self._load_or_build(name)
+        return num_pdfs, num_chunks
+    
+    def ensure_index(self, name: str):
+        """Make sure a persisted, up-to-date shard exists without loading it; returns (num_pdfs, num_chunks)"""
+        if self._is_fresh(name):
+            return len(self.pdf_files(name)), self._read_manifest(name).get("chunks", 0)
+        _, num_pdfs, num_chunks = self._load_or_build(name)
+        return num_pdfs, num_chunks
+    
+    def get(self, name: str):
+        """Return the vector store of a collection, loading or rebuilding it on demand"""
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry:
+                entry[1] = time.monotonic()
+                self._loaded.move_to_end(name)
+                self._evict_locked()
+                return entry[0]
+        
+        store, _, _ = self._load_or_build(name)
+        return store
+    
+    @contextmanager
+    def checkout(self, names: List[str]):
+        """Pin the shards one fan-out searches so loads in other threads can't evict them"""
+        with self._lock:
+            if len(names) > self.max_loaded:
+                self._capacity = max(self._capacity, len(names))
+                self._wide_search_at = time.monotonic()
+            for name in names:
+                self._pinned[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for name in names:
+                    self._pinned[name] -= 1
+                    if self._pinned[name] <= 0:
+                        del self._pinned[name]
+                self._evict_locked()
+    
+    def _put(self, name: str, store):
+        with self._lock:
+            self._loaded[name] = [store, time.monotonic()]
+            self._loaded.move_to_end(name)
+            self._evict_locked()
+    
+    def _evict_locked(self):
+        now = time.monotonic()
+        if self._capacity > self.max_loaded and now - self._wide_search_at > self.idle_seconds:
+            self._capacity = self.max_loaded
+        for name, (_, last_used) in list(self._loaded.items()):
+            if name not in self._pinned and now - last_used > self.idle_seconds:
+                del self._loaded[name]
+                logger.info(f"Evicted idle collection '{name}' from memory")
+        for name in list(self._loaded):
+            if len(self._loaded) <= self._capacity:
+                break
+            if name not in self._pinned:
+                del self._loaded[name]
+                logger.info(f"Evicted collection '{name}' from memory")
+    
+    def evict_idle(self):
+        with self._lock:
+            self._evict_locked()
+    
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            return self._loaded.pop(name, None) is not None
+    
+    def stats(self) -> List[dict]:
+        with self._lock:
+            self._evict_locked()
+            loaded = set(self._loaded)
+        
+        collections = []
+        for name in self.names():
+            manifest = self._read_manifest(name) or {}
+            collections.append({
+                "name": name,
+                "pdfs": len(self.pdf_files(name)),
+                "chunks": manifest.get("chunks", 0),
+                "loaded": name in loaded,
+                "index_fresh": self._is_fresh(name)
+            })
+        return collections
+
+async def evict_idle_collections():
+    """Periodically drop shards nobody has queried for COLLECTION_IDLE_SECONDS"""
+    while True:
+        await asyncio.sleep(max(COLLECTION_IDLE_SECONDS // 4, 1))
+        if collection_registry is not None:
+            collection_registry.evict_idle()
+
 def initialize_rag_system(pdf_folder_path: str):
     """Initialize the RAG system with PDFs from a folder and load reranker"""
-    global vector_store, retriever, reranker
+    global collection_registry, reranker, embeddings
     
     # Initialize reranker
     try:
@@ -228,93 +820,223 @@ def initialize_rag_system(pdf_folder_path: str):
         logger.error(f"Failed to load reranker: {e}")
         reranker = None
     
-    # Get all PDF files
-    pdf_files = []
-    for filename in os.listdir(pdf_folder_path):
-        if filename.lower().endswith('.pdf'):
-            pdf_files.append(os.path.join(pdf_folder_path, filename))
+    # Create embeddings shared by every collection
+    logger.info("Loading embedding model...")
+    embeddings = HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
     
-    if not pdf_files:
+    registry = CollectionRegistry(pdf_folder_path, INDEX_FOLDER, MAX_LOADED_COLLECTIONS, COLLECTION_IDLE_SECONDS)
+    names = registry.names()
+    if not names:
         logger.warning("No PDF files found in the specified folder")
         raise Exception("No PDF files found in the specified folder")
     
-    # Extract text from all PDFs with metadata
-    documents = []
-    for pdf_path in pdf_files:
-        logger.info(f"Processing {pdf_path}")
-        pdf_text = extract_text_from_pdf(pdf_path)
-        if pdf_text:
-            # Create chunks with metadata
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=800, 
-                chunk_overlap=100,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
-            chunks = splitter.create_documents(
-                [pdf_text], 
-                metadatas=[{"source": os.path.basename(pdf_path)}]
-            )
-            documents.extend(chunks)
+    # Build stale or missing shards now; fresh ones stay on disk until first queried
+    total_pdfs = 0
+    total_chunks = 0
+    for name in names:
+        try:
+            num_pdfs, num_chunks = registry.ensure_index(name)
+            total_pdfs += num_pdfs
+            total_chunks += num_chunks
+        except Exception as e:
+            logger.error(f"Error indexing collection '{name}': {e}")
     
-    if not documents:
+    if total_chunks == 0:
         raise Exception("No text could be extracted from PDF files")
     
-    # Create embeddings and vector store
-    logger.info("Creating embeddings and vector store...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
-    vector_store = FAISS.from_documents(documents, embeddings)
+    collection_registry = registry
+    logger.info(f"RAG system initialized with {len(names)} collections, {total_pdfs} PDFs and {total_chunks} chunks")
+    return total_pdfs, total_chunks
+
+def is_rag_ready() -> bool:
+    return collection_registry is not None and embeddings is not None
+
+def resolve_collections(requested: Optional[List[str]]) -> List[str]:
+    """Validate the collections a request targets; None or empty means all of them"""
+    available = collection_registry.names()
+    if not requested:
+        return available
     
-    # Set up retriever with increased initial results for reranking
-    retriever = vector_store.as_retriever(
-        search_type="similarity", 
-        search_kwargs={"k": 20}  # Get more initial results for reranking
-    )
+    requested = list(dict.fromkeys(normalize_collection_name(name) for name in requested))
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown collections: {', '.join(unknown)}")
     
-    logger.info(f"RAG system initialized with {len(pdf_files)} PDFs and {len(documents)} chunks")
-    return len(pdf_files), len(documents)
+    return requested
 
-def rerank_documents(query: str, documents: List, top_k: int = 10):
-    """Rerank documents using cross-encoder"""
-    if not reranker or not documents:
-        return documents[:top_k]
+def select_candidate_depth(similarities: List[float]) -> int:
+    """Pick how many dense candidates to keep from the shape of the similarity curve
     
-    try:
-        # Prepare query-document pairs
-        query_doc_pairs = [(query, doc.page_content) for doc in documents]
+    A clear winner means the rest of the list is unlikely to matter, so we keep few
+    candidates; a flat curve means the dense scores can't separate them, so we keep more.
+    """
+    if len(similarities) < 2:
+        return len(similarities)
+    
+    if similarities[0] - similarities[1] >= CLEAR_WINNER_MARGIN:
+        return min(RETRIEVAL_MIN_K, len(similarities))
+    
+    base_k = min(RETRIEVAL_K, len(similarities))
+    if similarities[0] - similarities[base_k - 1] <= FLAT_SCORE_SPREAD:
+        return min(RETRIEVAL_MAX_K, len(similarities))
+    
+    return base_k
+
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="collection-search")
+
+def search_collection(name: str, query_vectors, k: int):
+    """Multi-query FAISS search on one shard; returns (document, cosine similarity) pairs per query"""
+    store = collection_registry.get(name)
+    distances, indices = store.index.search(query_vectors, k)
+    
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        scored_docs = []
+        for distance, idx in zip(row_distances, row_indices):
+            if idx == -1:  # FAISS pads with -1 when the index has fewer than k vectors
+                continue
+            doc_id = store.index_to_docstore_id[int(idx)]
+            # Embeddings are normalized, so squared L2 distance maps directly to cosine similarity
+            similarity = 1.0 - float(distance) / 2.0
+            scored_docs.append((store.docstore.search(doc_id), similarity))
+        results.append(scored_docs)
+    
+    return results
+
+def batch_similarity_search(questions: List[str], collections: Optional[List[str]] = None, k: int = RETRIEVAL_MAX_K):
+    """Embed all questions in one forward pass and search every targeted collection in parallel
+    
+    Returns (document, cosine similarity) pairs per question, merged across collections,
+    best first, already cut to an adaptive depth. All shards share one normalized
+    embedding model, so cosine similarity is a common scale for merging.
+    """
+    if not is_rag_ready():
+        raise Exception("RAG system not initialized")
+    
+    if collections is None:
+        collections = collection_registry.names()
+    query_vectors = np.array(embeddings.embed_documents(questions), dtype=np.float32)
+    
+    with collection_registry.checkout(collections):
+        if len(collections) == 1:
+            per_collection = [search_collection(collections[0], query_vectors, k)]
+        else:
+            # FAISS releases the GIL while searching, so shards run concurrently
+            per_collection = list(_search_executor.map(
+                lambda name: search_collection(name, query_vectors, k),
+                collections
+            ))
+    
+    results = []
+    for query_index in range(len(questions)):
+        merged = [pair for shard in per_collection for pair in shard[query_index]]
+        merged.sort(key=lambda x: x[1], reverse=True)
+        merged = merged[:k]
         
-        # Get reranking scores
+        depth = select_candidate_depth([similarity for _, similarity in merged])
+        results.append(merged[:depth])
+    
+    return results
+
+def batch_rerank_documents(queries: List[str], candidates_per_query: List[List], top_k: int = 10):
+    """Rerank the candidates of several queries in stages, sharing one cross-encoder batch
+    
+    Stage 1 uses the dense similarity: candidates far below the best one are dropped and a
+    clear winner is accepted as is. Stage 2 cross-encodes only the ambiguous middle and drops
+    chunks scoring under MIN_RERANK_SCORE. Returns (documents, number cross-encoded) per query.
+    """
+    accepted_per_query = []
+    middle_per_query = []
+    for candidates in candidates_per_query:
+        candidates = [(doc, sim) for doc, sim in candidates if sim >= MIN_DENSE_SIMILARITY]
+        accepted = []
+        middle = []
+        if candidates:
+            top_similarity = candidates[0][1]
+            clear_winner = len(candidates) == 1 or top_similarity - candidates[1][1] >= CLEAR_WINNER_MARGIN
+            for position, (doc, similarity) in enumerate(candidates):
+                if position == 0 and clear_winner:
+                    accepted.append(doc)
+                elif top_similarity - similarity <= DENSE_DROP_MARGIN:
+                    middle.append(doc)
+        accepted_per_query.append(accepted)
+        middle_per_query.append(middle)
+    
+    def dense_order():
+        return [
+            ((accepted + middle)[:top_k], 0)
+            for accepted, middle in zip(accepted_per_query, middle_per_query)
+        ]
+    
+    if not reranker:
+        return dense_order()
+    
+    # Flatten the remaining query-document pairs so the cross-encoder runs once
+    query_doc_pairs = []
+    for query, middle in zip(queries, middle_per_query):
+        query_doc_pairs.extend((query, doc.page_content) for doc in middle)
+    
+    if not query_doc_pairs:
+        logger.info("Dense scores were decisive, skipping cross-encoder")
+        return dense_order()
+    
+    try:
         scores = reranker.predict(query_doc_pairs)
         
-        # Sort documents by score
-        doc_score_pairs = list(zip(documents, scores))
-        doc_score_pairs.sort(key=lambda x: x[1], reverse=True)
-        
-        # Return top-k reranked documents
-        reranked_docs = [doc for doc, score in doc_score_pairs[:top_k]]
+        # Split the scores back per query and sort each group
+        reranked = []
+        offset = 0
+        for accepted, middle in zip(accepted_per_query, middle_per_query):
+            doc_score_pairs = list(zip(middle, scores[offset:offset + len(middle)]))
+            offset += len(middle)
+            doc_score_pairs = [(doc, score) for doc, score in doc_score_pairs if score >= MIN_RERANK_SCORE]
+            doc_score_pairs.sort(key=lambda x: x[1], reverse=True)
+            docs = accepted + [doc for doc, score in doc_score_pairs]
+            reranked.append((docs[:top_k], len(middle)))
         
-        logger.info(f"Reranked {len(documents)} documents, returning top {len(reranked_docs)}")
-        return reranked_docs
+        logger.info(f"Reranked {len(query_doc_pairs)} pairs for {len(queries)} queries, returning up to {top_k} each")
+        return reranked
         
     except Exception as e:
         logger.error(f"Error in reranking: {e}")
-        return documents[:top_k]
+        return dense_order()
 
-def create_rag_chain(llm_provider: str, model_name: Optional[str] = None, use_reranker: bool = True, max_chunks: int = 10):
-    """Create RAG chain with specified LLM and reranking"""
-    if retriever is None:
-        raise Exception("RAG system not initialized")
+def batch_retrieve_documents(questions: List[str], use_reranker: bool = True, max_chunks: int = 10, collections: Optional[List[str]] = None):
+    """Retrieve and rerank documents for several questions with shared model calls
     
-    # Get LLM
-    llm, llm_description = get_llm(llm_provider, model_name)
+    Returns (documents, stats) per question, where stats holds the actual number of
+    chunks retrieved, reranked and used.
+    """
+    candidates_per_query = batch_similarity_search(questions, collections)
     
-    # Enhanced prompt with source citations
-    prompt = PromptTemplate(
-        template="""
+    if use_reranker and reranker:
+        ranked = batch_rerank_documents(questions, candidates_per_query, max_chunks)
+    else:
+        ranked = [
+            ([doc for doc, sim in candidates if sim >= MIN_DENSE_SIMILARITY][:max_chunks], 0)
+            for candidates in candidates_per_query
+        ]
+    
+    results = []
+    for candidates, (docs, num_reranked) in zip(candidates_per_query, ranked):
+        stats = {
+            "chunks_retrieved": len(candidates),
+            "chunks_reranked": num_reranked,
+            "chunks_used": len(docs)
+        }
+        results.append((docs, stats))
+    
+    return results
+
+def retrieve_documents(question: str, use_reranker: bool = True, max_chunks: int = 10, collections: Optional[List[str]] = None):
+    """Retrieve documents for a single question; returns (documents, stats)"""
+    return batch_retrieve_documents([question], use_reranker, max_chunks, collections)[0]
+
+RAG_PROMPT_TEMPLATE = """
 You are a helpful AI assistant for a company. Answer questions based ONLY on the provided document context.
 
 Guidelines:
@@ -331,46 +1053,263 @@ Context from documents:
 
 Question: {question}
 
-Answer:""",
+Answer:"""
+
+def format_docs(retrieved_docs):
+    """Format documents with source information"""
+    if not retrieved_docs:
+        return "No relevant documents found."
+    
+    formatted_chunks = []
+    for i, doc in enumerate(retrieved_docs, 1):
+        source = doc.metadata.get('source', 'Unknown')
+        content = doc.page_content.strip()
+        formatted_chunks.append(f"[Source {i}: {source}]\n{content}")
+    
+    return "\n\n".join(formatted_chunks)
+
+def create_answer_chain(llm):
+    """Create the prompt -> LLM -> parser chain that answers from formatted context"""
+    prompt = PromptTemplate(
+        template=RAG_PROMPT_TEMPLATE,
         input_variables=['context', 'question']
     )
+    return prompt | llm | StrOutputParser()
+
+# Conversation sessions
+CHAT_PROMPT_TEMPLATE = """
+You are a helpful AI assistant for a company. Answer questions based ONLY on the provided document context.
+Use the conversation so far only to understand what the user is referring to.
+
+Guidelines:
+- Answer ONLY from the provided context
+- If context is insufficient, say "I don't have enough information to answer this question"
+- Be polite and professional as you're assisting fellow employees
+- Write in Bangla if user writes in Bangla, otherwise use English
+- Provide detailed, descriptive answers with bullet points when appropriate
+- Include source references when mentioning specific information
+- Guide users on where they can find more detailed information
+
+Context from documents:
+{context}
+
+Conversation so far:
+{history}
+
+Question: {question}
+
+Answer:"""
+
+CONDENSE_PROMPT_TEMPLATE = """
+Given the conversation so far and a follow-up question, rewrite the follow-up question as a
+standalone question that can be understood without the conversation. Keep the user's language.
+If the follow-up is already standalone, return it unchanged. Return ONLY the question.
+
+Conversation so far:
+{history}
+
+Follow-up question: {question}
+
+Standalone question:"""
+
+SUMMARY_PROMPT_TEMPLATE = """
+Progressively summarize the conversation between an employee and the company assistant.
+Extend the current summary with the new turns. Keep names, products, documents and open
+questions the user may refer to later. Use at most {max_words} words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+New summary:"""
+
+_token_encoder = None
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to a character estimate"""
+    global _token_encoder
+    if _token_encoder is None:
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+            _token_encoder = False
     
-    def enhanced_retrieval(question):
-        """Enhanced retrieval with reranking"""
-        # Get initial documents
-        initial_docs = retriever.invoke(question)
-        
-        # Apply reranking if enabled
-        if use_reranker and reranker:
-            final_docs = rerank_documents(question, initial_docs, max_chunks)
-        else:
-            final_docs = initial_docs[:max_chunks]
-        
-        return final_docs
+    if _token_encoder:
+        return len(_token_encoder.encode(text))
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text so it fits in max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _token_encoder:
+        return _token_encoder.decode(_token_encoder.encode(text)[:max_tokens])
+    return text[:max_tokens * 4]
+
+class ConversationSession:
+    """Rolling history of one chat: a running summary plus the most recent turns"""
+    
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.summary = ""
+        self.turns = []  # (question, answer) pairs, oldest first
+        self.last_access = time.monotonic()
+        self.lock = asyncio.Lock()  # Serializes turns and summarization within a session
+        self.summary_failures = 0
+    
+    def add_turn(self, question: str, answer: str):
+        # A single long answer must not blow the budget on its own
+        max_turn_tokens = HISTORY_TOKEN_BUDGET // 2
+        self.turns.append((
+            truncate_to_tokens(question, max_turn_tokens),
+            truncate_to_tokens(answer, max_turn_tokens)
+        ))
+    
+    def drop_oldest_turns(self) -> int:
+        """Drop the oldest turns until the rest fit the history budget; returns how many were dropped"""
+        dropped = 0
+        while len(self.turns) > 1 and self.turns_tokens() > HISTORY_TOKEN_BUDGET:
+            self.turns.pop(0)
+            dropped += 1
+        return dropped
+    
+    def turns_tokens(self) -> int:
+        return sum(count_tokens(q) + count_tokens(a) for q, a in self.turns)
+    
+    def format_history(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+        for question, answer in self.turns:
+            parts.append(f"User: {question}\nAssistant: {answer}")
+        return "\n\n".join(parts) if parts else "No previous conversation."
+
+class SessionStore:
+    """In-memory conversation sessions with LRU and TTL eviction"""
+    
+    def __init__(self, max_sessions: int, ttl_seconds: int):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()  # Least recently used first
     
-    def format_docs(retrieved_docs):
-        """Format documents with source information"""
-        if not retrieved_docs:
-            return "No relevant documents found."
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_access <= self.ttl_seconds and len(self._sessions) < self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            logger.info(f"Evicted conversation session {oldest.session_id}")
+    
+    def get_or_create(self, session_id: Optional[str] = None) -> ConversationSession:
+        """Return the live session for session_id, or start a new one"""
+        session = self._sessions.get(session_id) if session_id else None
+        if session and time.monotonic() - session.last_access > self.ttl_seconds:
+            del self._sessions[session_id]
+            session = None
         
-        formatted_chunks = []
-        for i, doc in enumerate(retrieved_docs, 1):
-            source = doc.metadata.get('source', 'Unknown')
-            content = doc.page_content.strip()
-            formatted_chunks.append(f"[Source {i}: {source}]\n{content}")
+        if session is None:
+            self._evict()
+            session = ConversationSession(uuid.uuid4().hex)
+            self._sessions[session.session_id] = session
         
-        return "\n\n".join(formatted_chunks)
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(session.session_id)
+        return session
+    
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+    
+    def __len__(self):
+        return len(self._sessions)
+
+chat_sessions = SessionStore(SESSION_MAX_SESSIONS, SESSION_TTL_SECONDS)
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-run
+_background_tasks = set()
 
-    # Create the enhanced chain
-    parallel_chain = RunnableParallel({
-        'context': RunnableLambda(enhanced_retrieval) | RunnableLambda(format_docs),
-        'question': RunnablePassthrough()
-    })
+def spawn_background(coro):
+    """Run a coroutine after the response without tying it to the request lifecycle"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def condense_question(llm, session: ConversationSession, question: str) -> str:
+    """Rewrite a follow-up question into a standalone retrieval query"""
+    if not session.turns and not session.summary:
+        return question
     
-    parser = StrOutputParser()
-    chain = parallel_chain | prompt | llm | parser
+    prompt = PromptTemplate(template=CONDENSE_PROMPT_TEMPLATE, input_variables=['history', 'question'])
+    chain = prompt | llm | StrOutputParser()
+    try:
+        standalone = (await chain.ainvoke({
+            "history": session.format_history(),
+            "question": question
+        })).strip()
+        return standalone or question
+    except Exception as e:
+        logger.error(f"Error condensing question, using it as is: {e}")
+        return question
+
+async def summarize_session(llm, session: ConversationSession, ticket: Optional["AdmissionTicket"] = None):
+    """Fold the oldest turns into the running summary until history fits the token budget
     
-    return chain, llm_description
+    Releases the admission ticket of the chat turn that triggered it when done, so the
+    summary LLM call counts against the same limits as the turn itself.
+    """
+    try:
+        await _summarize_session(llm, session)
+    finally:
+        if ticket:
+            ticket.release()
+
+async def _summarize_session(llm, session: ConversationSession):
+    async with session.lock:
+        if session.turns_tokens() <= HISTORY_TOKEN_BUDGET:
+            return
+        
+        # Pick the oldest turns to fold in, but only drop them once the summary exists
+        remaining_tokens = session.turns_tokens()
+        num_old = 0
+        while num_old < len(session.turns) - 1 and remaining_tokens > HISTORY_TOKEN_BUDGET:
+            question, answer = session.turns[num_old]
+            remaining_tokens -= count_tokens(question) + count_tokens(answer)
+            num_old += 1
+        
+        if not num_old:
+            return
+        
+        old_turns = session.turns[:num_old]
+        prompt = PromptTemplate(
+            template=SUMMARY_PROMPT_TEMPLATE,
+            input_variables=['summary', 'turns', 'max_words']
+        )
+        chain = prompt | llm | StrOutputParser()
+        try:
+            summary = await chain.ainvoke({
+                "summary": session.summary or "None yet.",
+                "turns": "\n\n".join(f"User: {q}\nAssistant: {a}" for q, a in old_turns),
+                "max_words": SUMMARY_TOKEN_BUDGET * 3 // 4
+            })
+        except Exception as e:
+            # Keep the turns so the next pass can retry, but don't let history grow without bound
+            session.summary_failures += 1
+            logger.error(f"Error summarizing session {session.session_id} (attempt {session.summary_failures}): {e}")
+            if session.summary_failures >= SUMMARY_MAX_FAILURES:
+                dropped = session.drop_oldest_turns()
+                session.summary_failures = 0
+                logger.warning(f"Dropped {dropped} unsummarized turns of session {session.session_id}")
+            return
+        
+        session.summary_failures = 0
+        del session.turns[:num_old]
+        session.summary = truncate_to_tokens(summary.strip(), SUMMARY_TOKEN_BUDGET)
+        logger.info(f"Summarized {num_old} turns of session {session.session_id}")
 
 # Helper functions for user management
 def username_exists(username: str) -> bool:
@@ -582,7 +1521,7 @@ async def root():
 @app.get("/status")
 async def get_status():
     """Get system status"""
-    if retriever is None:
+    if not is_rag_ready():
         return {"status": "not_initialized", "message": "RAG system not initialized"}
     
     return {
@@ -590,9 +1529,17 @@ async def get_status():
         "message": "RAG system ready to answer questions",
         "current_llm": current_llm_config,
         "reranker_available": reranker is not None,
-        "vector_store_ready": vector_store is not None
+        "vector_store_ready": is_rag_ready(),
+        "collections": collection_registry.names(),
+        "active_chat_sessions": len(chat_sessions),
+        "queue_depth": admission.stats()["queue_depth"]
     }
 
+@app.get("/admission-stats")
+async def get_admission_stats(current_user: dict = Depends(verify_admin_token)):
+    """Queue depth, wait times and rejection counts of the question endpoints (Admin only)"""
+    return admission.stats()
+
 @app.get("/llm-options")
 async def get_llm_options():
     """Get available LLM options"""
@@ -644,8 +1591,12 @@ async def configure_llm(config: LLMConfigRequest, current_user: dict = Depends(v
 
 # Document management endpoints
 @app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...), current_user: dict = Depends(verify_admin_token)):
-    """Upload a PDF file to the pdfs folder and reinitialize RAG system (Admin only)"""
+async def upload_pdf(
+    file: UploadFile = File(...),
+    collection: str = Form(DEFAULT_COLLECTION),
+    current_user: dict = Depends(verify_admin_token)
+):
+    """Upload a PDF file into a collection and rebuild only that collection's index (Admin only)"""
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
@@ -653,34 +1604,53 @@ async def upload_pdf(file: UploadFile = File(...), current_user: dict = Depends(
     if file.size and file.size > 50 * 1024 * 1024:
         raise HTTPException(status_code=400, detail="File size too large. Maximum 50MB allowed.")
     
+    collection = normalize_collection_name(collection)
+    if not is_valid_collection_name(collection):
+        raise HTTPException(
+            status_code=400,
+            detail="Collection name can only contain letters, numbers, underscores, and hyphens (max 40 characters)"
+        )
+    
     file_path = None
     try:
-        # Ensure pdfs folder exists
-        pdf_folder = "pdfs"
+        # Ensure the collection folder exists
+        # Reuse an existing folder for this collection even if its name differs in case
+        if is_rag_ready():
+            pdf_folder = collection_registry.folder(collection)
+        else:
+            pdf_folder = PDF_FOLDER if collection == DEFAULT_COLLECTION else os.path.join(PDF_FOLDER, collection)
         if not os.path.exists(pdf_folder):
             os.makedirs(pdf_folder)
         
         # Save the uploaded file with timestamp to avoid conflicts
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{file.filename}"
+        safe_filename = f"{timestamp}_{os.path.basename(file.filename)}"
         file_path = os.path.join(pdf_folder, safe_filename)
         
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
         
-        logger.info(f"PDF uploaded by admin: {safe_filename}")
+        logger.info(f"PDF uploaded by admin to collection '{collection}': {safe_filename}")
         
-        # Reinitialize RAG system with all PDFs
-        global vector_store, retriever
-        num_pdfs, num_chunks = initialize_rag_system(pdf_folder)
+        # Rebuild only the affected shard, off the event loop so questions keep flowing
+        if is_rag_ready():
+            num_pdfs, num_chunks = await run_in_threadpool(collection_registry.build, collection)
+        else:
+            await run_in_threadpool(initialize_rag_system, PDF_FOLDER)
+            num_pdfs, num_chunks = await run_in_threadpool(collection_registry.ensure_index, collection)
+        
+        collections = collection_registry.stats()
         
         return {
             "status": "success",
-            "message": f"PDF uploaded successfully and RAG system updated",
+            "message": f"PDF uploaded successfully and collection '{collection}' updated",
             "filename": safe_filename,
             "original_filename": file.filename,
-            "total_pdfs": num_pdfs,
-            "total_chunks": num_chunks
+            "collection": collection,
+            "collection_pdfs": num_pdfs,
+            "collection_chunks": num_chunks,
+            "total_pdfs": sum(c["pdfs"] for c in collections),
+            "total_chunks": sum(c["chunks"] for c in collections)
         }
         
     except Exception as e:
@@ -691,20 +1661,23 @@ async def upload_pdf(file: UploadFile = File(...), current_user: dict = Depends(
         raise HTTPException(status_code=500, detail=f"Error uploading PDF: {str(e)}")
 
 @app.get("/documents")
-async def list_documents(current_user: dict = Depends(verify_any_token)):
-    """List all PDF documents in the system"""
+async def list_documents(collection: Optional[str] = None, current_user: dict = Depends(verify_any_token)):
+    """List PDF documents in the system, optionally for a single collection"""
     try:
-        pdf_folder = "pdfs"
-        if not os.path.exists(pdf_folder):
-            return {"documents": [], "total": 0}
+        registry = collection_registry or CollectionRegistry(
+            PDF_FOLDER, INDEX_FOLDER, MAX_LOADED_COLLECTIONS, COLLECTION_IDLE_SECONDS
+        )
+        names = registry.names()
+        if collection:
+            names = [name for name in names if name == normalize_collection_name(collection)]
         
         documents = []
-        for filename in os.listdir(pdf_folder):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(pdf_folder, filename)
+        for name in names:
+            for file_path in registry.pdf_files(name):
                 stat = os.stat(file_path)
                 documents.append({
-                    "filename": filename,
+                    "filename": os.path.basename(file_path),
+                    "collection": name,
                     "size_mb": round(stat.st_size / (1024 * 1024), 2),
                     "uploaded_date": datetime.fromtimestamp(stat.st_ctime).isoformat()
                 })
@@ -719,44 +1692,285 @@ async def list_documents(current_user: dict = Depends(verify_any_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing documents: {str(e)}")
 
+@app.get("/collections")
+async def list_collections(current_user: dict = Depends(verify_any_token)):
+    """List document collections with their size and whether their index is in memory"""
+    if not is_rag_ready():
+        raise HTTPException(status_code=503, detail="RAG system not initialized. Please contact administrator.")
+    
+    collections = await run_in_threadpool(collection_registry.stats)
+    return {"collections": collections, "total": len(collections)}
+
+@app.delete("/collections/{name}/cache")
+async def evict_collection(name: str, current_user: dict = Depends(verify_admin_token)):
+    """Drop a collection's index from memory; it is reloaded from disk on next use (Admin only)"""
+    if not is_rag_ready():
+        raise HTTPException(status_code=503, detail="RAG system not initialized. Please contact administrator.")
+    
+    if not collection_registry.evict(normalize_collection_name(name)):
+        raise HTTPException(status_code=404, detail="Collection is not loaded")
+    
+    return {"status": "success", "message": f"Collection '{name}' evicted from memory"}
+
 # Chat endpoint
 @app.post("/ask", response_model=QuestionResponse)
-async def ask_question(request: QuestionRequest):
+async def ask_question(
+    request: QuestionRequest,
+    identity: dict = Depends(get_request_identity),
+    timeout: Optional[float] = Depends(get_request_timeout)
+):
     """Ask a question to the RAG system with enhanced retrieval and reranking (Open access)"""
-    if retriever is None:
+    if not is_rag_ready():
         raise HTTPException(status_code=503, detail="RAG system not initialized. Please contact administrator.")
     
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
+    collections = resolve_collections(request.collections)
+    ticket = await admission.admit(identity, timeout)
     try:
         # Use specified LLM or fall back to current config
         llm_provider = request.llm_provider or current_llm_config["provider"]
         model_name = request.model_name or current_llm_config["model"]
         
-        # Create RAG chain with enhanced retrieval
-        chain, llm_description = create_rag_chain(
-            llm_provider, 
-            model_name, 
-            request.use_reranker, 
-            request.max_chunks
+        llm, llm_description = get_llm(llm_provider, model_name)
+        
+        # Adaptive retrieval and staged reranking
+        docs, stats = await run_in_threadpool(
+            retrieve_documents,
+            request.question,
+            request.use_reranker,
+            request.max_chunks,
+            collections
         )
         
         # Get answer from RAG system
-        logger.info(f"Processing question with {llm_description}, reranker: {request.use_reranker}")
-        answer = chain.invoke(request.question)
+        logger.info(f"Processing question with {llm_description}, reranker: {request.use_reranker}, chunks: {stats}")
+        answer = await create_answer_chain(llm).ainvoke({
+            "context": format_docs(docs),
+            "question": request.question
+        })
         
         return QuestionResponse(
             answer=answer,
             status="success",
             llm_used=llm_description,
-            chunks_used=min(request.max_chunks, 20),
-            reranker_used=request.use_reranker and reranker is not None
+            reranker_used=request.use_reranker and reranker is not None,
+            **stats
         )
         
     except Exception as e:
         logger.error(f"Error processing question: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+    finally:
+        ticket.release()
+
+@app.post("/ask/batch", response_model=BatchQuestionResponse)
+async def ask_questions_batch(
+    request: BatchQuestionRequest,
+    identity: dict = Depends(get_request_identity),
+    timeout: Optional[float] = Depends(get_request_timeout)
+):
+    """Answer many questions at once with shared embedding, search and reranking work (Open access)
+    
+    With ``stream=true`` the answers are returned as NDJSON lines in completion order;
+    each line carries the ``index`` of its question.
+    """
+    if not is_rag_ready():
+        raise HTTPException(status_code=503, detail="RAG system not initialized. Please contact administrator.")
+    
+    questions = [question.strip() for question in request.questions]
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+    
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions. Maximum {BATCH_MAX_QUESTIONS} per batch."
+        )
+    
+    if not all(questions):
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    
+    concurrency = min(request.max_concurrency or BATCH_LLM_CONCURRENCY, BATCH_LLM_CONCURRENCY, len(questions))
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    
+    collections = resolve_collections(request.collections)
+    # Every question costs a rate token and every concurrent LLM call takes a slot
+    ticket = await admission.admit(identity, timeout, cost=len(questions), slots=concurrency)
+    streaming = False
+    try:
+        try:
+            llm_provider = request.llm_provider or current_llm_config["provider"]
+            model_name = request.model_name or current_llm_config["model"]
+            llm, llm_description = get_llm(llm_provider, model_name)
+            chain = create_answer_chain(llm)
+        
+            # Retrieval and reranking are CPU-bound, keep them off the event loop
+            retrieval_results = await run_in_threadpool(
+                batch_retrieve_documents,
+                questions,
+                request.use_reranker,
+                request.max_chunks,
+                collections
+            )
+        except Exception as e:
+            logger.error(f"Error preparing batch: {e}")
+            raise HTTPException(status_code=500, detail=f"Error processing questions: {str(e)}")
+        
+        logger.info(f"Processing batch of {len(questions)} questions with {llm_description}, concurrency: {ticket.slots}")
+        semaphore = asyncio.Semaphore(ticket.slots)
+        
+        async def answer_question(index: int) -> BatchAnswer:
+            docs, stats = retrieval_results[index]
+            async with semaphore:
+                try:
+                    answer = await chain.ainvoke({
+                        "context": format_docs(docs),
+                        "question": questions[index]
+                    })
+                    return BatchAnswer(
+                        index=index,
+                        question=questions[index],
+                        answer=answer,
+                        status="success",
+                        **stats
+                    )
+                except Exception as e:
+                    logger.error(f"Error answering batch question {index}: {e}")
+                    return BatchAnswer(
+                        index=index,
+                        question=questions[index],
+                        answer="",
+                        status="error",
+                        error=str(e),
+                        **stats
+                    )
+        
+        tasks = [asyncio.create_task(answer_question(i)) for i in range(len(questions))]
+        
+        if request.stream:
+            async def stream_answers():
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        result = await next_done
+                        yield json.dumps(jsonable_encoder(result)) + "\n"
+                finally:
+                    # Client disconnected early: don't keep spending LLM quota
+                    for task in tasks:
+                        task.cancel()
+                    ticket.release()
+        
+            # The slot is held until the stream finishes
+            streaming = True
+            return StreamingResponse(
+                stream_answers(),
+                media_type="application/x-ndjson",
+                background=BackgroundTask(ticket.release)
+            )
+        
+        results = await asyncio.gather(*tasks)
+        failed = sum(1 for result in results if result.status != "success")
+        
+        return BatchQuestionResponse(
+            results=results,
+            status="success" if failed == 0 else ("error" if failed == len(results) else "partial"),
+            llm_used=llm_description,
+            reranker_used=request.use_reranker and reranker is not None,
+            total_questions=len(questions),
+            failed=failed
+        )
+    finally:
+        if not streaming:
+            ticket.release()
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    identity: dict = Depends(get_request_identity),
+    timeout: Optional[float] = Depends(get_request_timeout)
+):
+    """Answer a question within a conversation session (Open access)
+    
+    Pass the returned ``session_id`` with the next message to continue the conversation.
+    Follow-ups are condensed into standalone queries for retrieval, and older turns are
+    summarized in the background, still holding this request's admission slot, so the
+    prompt stays within a fixed token budget.
+    """
+    if not is_rag_ready():
+        raise HTTPException(status_code=503, detail="RAG system not initialized. Please contact administrator.")
+    
+    question = request.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    collections = resolve_collections(request.collections)
+    ticket = await admission.admit(identity, timeout)
+    session = chat_sessions.get_or_create(request.session_id)
+    ticket_handed_off = False
+    
+    try:
+        llm_provider = request.llm_provider or current_llm_config["provider"]
+        model_name = request.model_name or current_llm_config["model"]
+        llm, llm_description = get_llm(llm_provider, model_name)
+        
+        async with session.lock:
+            standalone_question = await condense_question(llm, session, question)
+            
+            docs, stats = await run_in_threadpool(
+                retrieve_documents,
+                standalone_question,
+                request.use_reranker,
+                request.max_chunks,
+                collections
+            )
+            
+            prompt = PromptTemplate(
+                template=CHAT_PROMPT_TEMPLATE,
+                input_variables=['context', 'history', 'question']
+            )
+            chain = prompt | llm | StrOutputParser()
+            
+            logger.info(f"Processing chat turn for session {session.session_id} with {llm_description}")
+            answer = await chain.ainvoke({
+                "context": format_docs(docs),
+                "history": session.format_history(),
+                "question": question
+            })
+            
+            session.add_turn(question, answer)
+            history_turns = len(session.turns)
+        
+        # The summary task releases the ticket once it finishes
+        spawn_background(summarize_session(llm, session, ticket))
+        ticket_handed_off = True
+        
+        return ChatResponse(
+            answer=answer,
+            status="success",
+            session_id=session.session_id,
+            standalone_question=standalone_question,
+            llm_used=llm_description,
+            reranker_used=request.use_reranker and reranker is not None,
+            history_turns=history_turns,
+            **stats
+        )
+        
+    except Exception as e:
+        logger.error(f"Error processing chat message: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+    finally:
+        if not ticket_handed_off:
+            ticket.release()
+
+@app.delete("/chat/{session_id}")
+async def end_chat(session_id: str):
+    """End a conversation session and drop its history"""
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return {"status": "success", "message": "Conversation ended"}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+main = pytest.importorskip("main")
+
+from fastapi import HTTPException
+
+
+def caller(key, role):
+    return {"key": key, "role": role}
+
+
+async def wait_in_queue(controller, identity, served, timeout=5):
+    """Queue for a slot, record the role once served, then release"""
+    try:
+        ticket = await controller.admit(identity, timeout)
+    except HTTPException as e:
+        served.append((identity["role"], e.status_code))
+        return
+    served.append(identity["role"])
+    await asyncio.sleep(0)
+    ticket.release()
+
+
+def test_waiters_are_served_by_priority():
+    async def scenario():
+        controller = main.AdmissionController(max_active=1, max_queue=10, per_user_concurrency=5)
+        holder = await controller.admit(caller("holder", "user"))
+        served = []
+        tasks = [
+            asyncio.create_task(wait_in_queue(controller, caller("anon", "anonymous"), served)),
+            asyncio.create_task(wait_in_queue(controller, caller("user", "user"), served)),
+            asyncio.create_task(wait_in_queue(controller, caller("admin", "admin"), served)),
+        ]
+        await asyncio.sleep(0.01)
+        assert controller.stats()["queue_depth"] == 3
+        holder.release()
+        await asyncio.gather(*tasks)
+        return served, controller.stats()
+
+    served, stats = asyncio.run(scenario())
+    assert served == ["admin", "user", "anonymous"]
+    assert stats["active"] == 0
+    assert stats["queue_depth"] == 0
+
+
+def test_full_queue_sheds_lowest_priority_waiter():
+    async def scenario():
+        controller = main.AdmissionController(max_active=1, max_queue=2, per_user_concurrency=5)
+        holder = await controller.admit(caller("holder", "user"))
+        served = []
+        tasks = [
+            asyncio.create_task(wait_in_queue(controller, caller("anon", "anonymous"), served)),
+            asyncio.create_task(wait_in_queue(controller, caller("user", "user"), served)),
+        ]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(wait_in_queue(controller, caller("admin", "admin"), served)))
+        await asyncio.sleep(0.01)
+        holder.release()
+        await asyncio.gather(*tasks)
+        return served, controller.stats()
+
+    served, stats = asyncio.run(scenario())
+    assert served == [("anonymous", 503), "admin", "user"]
+    assert stats["counters"]["rejected_shed"] == 1
+
+
+def test_full_queue_rejects_caller_that_outranks_nobody():
+    async def scenario():
+        controller = main.AdmissionController(max_active=1, max_queue=1, per_user_concurrency=5)
+        holder = await controller.admit(caller("holder", "user"))
+        served = []
+        waiting = asyncio.create_task(wait_in_queue(controller, caller("admin", "admin"), served))
+        await asyncio.sleep(0.01)
+        await wait_in_queue(controller, caller("anon", "anonymous"), served)
+        holder.release()
+        await waiting
+        return served
+
+    assert asyncio.run(scenario()) == [("anonymous", 503), "admin"]
+
+
+def test_deadline_expires_in_queue():
+    async def scenario():
+        controller = main.AdmissionController(max_active=1, max_queue=5, per_user_concurrency=5)
+        holder = await controller.admit(caller("holder", "user"))
+        served = []
+        await wait_in_queue(controller, caller("late", "user"), served, timeout=0.05)
+        stats = controller.stats()
+        holder.release()
+        return served, stats, controller.stats()
+
+    served, while_held, after = asyncio.run(scenario())
+    assert served == [("user", 503)]
+    assert while_held["queue_depth"] == 0
+    assert after["active"] == 0
+
+
+def test_queued_requests_count_against_per_user_concurrency():
+    async def scenario():
+        controller = main.AdmissionController(max_active=1, max_queue=10, per_user_concurrency=2)
+        holder = await controller.admit(caller("holder", "user"))
+        served = []
+        tasks = [
+            asyncio.create_task(wait_in_queue(controller, caller("same", "user"), served))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0.01)
+        holder.release()
+        await asyncio.gather(*tasks)
+        return served
+
+    served = asyncio.run(scenario())
+    assert served.count("user") == 2
+    assert served.count(("user", 429)) == 2
+
+
+def test_batch_takes_several_slots_and_rate_tokens():
+    async def scenario():
+        controller = main.AdmissionController(max_active=4, max_queue=10, per_user_concurrency=5)
+        batch = await controller.admit(caller("batch", "user"), cost=5, slots=3)
+        active = controller.stats()["active"]
+        batch.release()
+        with pytest.raises(HTTPException) as too_large:
+            await controller.admit(caller("anon", "anonymous"), cost=main.ADMISSION_RATE_PER_MINUTE["anonymous"] + 1)
+        return active, too_large.value.status_code
+
+    assert asyncio.run(scenario()) == (3, 429)